@@ -3,166 +3,733 @@ from tkinter import ttk
 import psutil
 import threading
 import time
-import keyboard
 import sys
+import ctypes
+import subprocess
+import logging
 from datetime import datetime
 
+# Optional GPU backends - resolved once at startup instead of on every poll
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+
+try:
+    import pythoncom
+    import wmi
+except ImportError:
+    wmi = None
+
+# Errors meaning a backend isn't present on this machine rather than broken
+# (x_wmi: OpenHardwareMonitor's WMI namespace doesn't exist)
+BACKEND_ABSENT_ERRORS = (FileNotFoundError, AttributeError, ImportError)
+if wmi is not None:
+    BACKEND_ABSENT_ERRORS += (wmi.x_wmi,)
+
+# PDH (Windows performance counter) definitions used by the GPU usage fallback
+PDH_FMT_DOUBLE = 0x00000200
+PDH_MORE_DATA = 0x800007D2
+PDH_CSTATUS_VALID_DATA = 0x00000000
+PDH_CSTATUS_NEW_DATA = 0x00000001
+
+class PDH_FMT_COUNTERVALUE(ctypes.Structure):
+    class _Value(ctypes.Union):
+        _fields_ = [('longValue', ctypes.c_long),
+                    ('doubleValue', ctypes.c_double),
+                    ('largeValue', ctypes.c_longlong),
+                    ('AnsiStringValue', ctypes.c_char_p),
+                    ('WideStringValue', ctypes.c_wchar_p)]
+    _anonymous_ = ('value',)
+    _fields_ = [('CStatus', ctypes.c_ulong),
+                ('value', _Value)]
+
+class PDH_FMT_COUNTERVALUE_ITEM_W(ctypes.Structure):
+    _fields_ = [('szName', ctypes.c_wchar_p),
+                ('FmtValue', PDH_FMT_COUNTERVALUE)]
+
 class SystemMonitor:
-    def __init__(self, root):
+    # Targeted WQL queries so the filtering happens in WMI, not in Python
+    WMI_GPU_TEMP_QUERY = "SELECT Name, Value FROM Sensor WHERE SensorType='Temperature' AND Name LIKE '%GPU%'"
+    WMI_GPU_LOAD_QUERY = "SELECT Name, Value FROM Sensor WHERE SensorType='Load' AND Name LIKE '%GPU%'"
+    
+    # Sensor group name fragments that identify CPU temperatures
+    _CPU_KW = ('cpu', 'core')
+    
+    # Performance counter for GPU usage, one instance per engine
+    PDH_GPU_COUNTER = "\\GPU Engine(*)\\Utilization Percentage"
+    
+    # Pre-built label formatters, so ticks don't rebuild the constant parts
+    _F_USAGE = "Usage: {:.1f}%".format
+    _F_TEMP = "Temp: {:.1f}°C".format
+    _F_UPDATED = "Updated: {}".format
+    _USAGE_NA = "Usage: N/A"
+    _TEMP_NA = "Temp: N/A"
+    
+    # How long sampling waits on the GPU backend probe (nvidia-smi alone may use 5 s);
+    # probes that answer later can still take over
+    GPU_PROBE_TIMEOUT = 6.0
+    
+    # How often the hidden monitor refreshes cpu_percent's baseline (seconds)
+    HIDDEN_HEARTBEAT = 30.0
+    
+    # How long a sample waits for the first line of a just-started looping nvidia-smi
+    NVSMI_FIRST_LINE_TIMEOUT = 3.0
+    
+    def __init__(self, root, interval=2.0, max_interval=10.0, temp_every=4, global_hotkey=True):
         self.root = root
-        self.popup_window = None
         self.is_popup_visible = False
         self.monitoring = True
         
-        # System info storage
+        # Sampling backs off from interval towards max_interval while values are unchanged
+        self.interval = interval
+        self.max_interval = max_interval
+        self._current_interval = interval
+        self._last_vals = None
+        
+        # Samples are scheduled against absolute deadlines so the cadence doesn't drift
+        self._next_deadline = time.monotonic()
+        
+        # Temperatures move on thermal time constants, so only read them every Nth sample
+        self._temp_every = max(1, temp_every)
+        self._tick = 0
+        
+        # (group name, index) of the CPU temperature sensor, found on the first scan
+        self._cpu_temp_key = None
+        
+        # System info storage (owned by the tkinter thread)
         self.cpu_percent = 0
-        self.cpu_temp = "N/A"
-        self.gpu_temp = "N/A"
-        self.gpu_usage = "N/A"
+        # (None means the value is unavailable)
+        self.cpu_temp = None
+        self.gpu_temp = None
+        self.gpu_usage = None
         self.memory_percent = 0
+        # Wall-clock time (HH:MM:SS) the shown values were sampled at
+        self.sampled_at = None
+        
+        # Last value shown per label, so unchanged values skip formatting
+        self._shown = {}
         
-        # Setup hotkey monitoring in a separate thread
-        self.setup_hotkey_monitoring()
+        # Pending after() id for a coalesced popup refresh
+        self._pending_refresh = None
         
-        # Start system monitoring
-        self.update_system_info()
+        # Set to wake the metrics thread early (popup shown, shutdown)
+        self._wake = threading.Event()
+        
+        # Latest sample written by the metrics thread, guarded by _lock
+        self._lock = threading.Lock()
+        self._snapshot = {
+            'cpu_percent': self.cpu_percent,
+            'cpu_temp': self.cpu_temp,
+            'memory_percent': self.memory_percent,
+            'gpu_temp': self.gpu_temp,
+            'gpu_usage': self.gpu_usage,
+            'sampled_at': self.sampled_at,
+        }
+        
+        # Acquire a persistent NVML handle once instead of spawning nvidia-smi every poll
+        self._nvml_handle = None
+        if pynvml is not None:
+            try:
+                pynvml.nvmlInit()
+                self._nvml_handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+            except Exception:
+                pass
+        
+        # Long-lived nvidia-smi streaming one CSV line per interval, run by the metrics
+        # thread only while nvidia-smi is the latched backend and the popup is visible
+        self._nvsmi_proc = None
+        self._nvsmi_line = None
+        self._nvsmi_ready = threading.Event()
+        # Cleared if nvidia-smi can't be kept running, leaving one-shot reads
+        self._nvsmi_loop = True
+        
+        # OpenHardwareMonitor WMI connection, opened by the metrics thread if WMI is latched
+        self._wmi = None
+        
+        # PDH query for GPU usage, opened by the GPU backend probe
+        self._pdh_query = None
+        self._pdh_counters = {}
+        
+        # Backends that failed once and are skipped until reset_backends()
+        self._disabled = set()
+        # Set by reset_backends(), applied by the metrics thread before its next sample
+        self._reset_requested = False
+        
+        # GPU backend latched by the first probe ('none' when nothing works)
+        self._gpu_backend = None
+        self._gpu_backend_fn = None
+        
+        # Probes report back from their own threads; _probe_lock guards the latch and
+        # the round bookkeeping, so answers from an abandoned round are ignored
+        self._probe_lock = threading.Lock()
+        self._probe_round = 0
+        self._probe_best = (0, 0)
+        self._probe_pending = 0
+        self._probe_done = threading.Event()
+        
+        # System-wide hotkey via the keyboard library (may require admin); without it
+        # tkinter only delivers the hotkey while the popup has focus
+        self.global_hotkey = global_hotkey and self.setup_global_hotkey()
+        if not self.global_hotkey:
+            self.root.bind_all("<Control-Shift-KeyPress-M>", lambda e: self._toggle_popup_main_thread())
+        
+        # The root window itself is the popup; build it once and keep it hidden
+        self.create_popup()
+        self.root.withdraw()
+        if not self.global_hotkey:
+            # Minimizing/restoring from the taskbar counts as hiding/showing
+            self.root.bind("<Map>", self._on_map)
+            self.root.bind("<Unmap>", self._on_unmap)
+        
+        # Sample system metrics in a background thread so sensor calls never block the UI
+        self._metrics_thread = threading.Thread(target=self._sample_loop, daemon=True)
+        self._metrics_thread.start()
+        
+        # The tkinter loop only reads the latest snapshot
+        self.root.after(500, self._refresh_popup)
         
         print("System Monitor started!")
-        print("Press Ctrl+Shift+M to show/hide system info")
+        if self.global_hotkey:
+            print("Press Ctrl+Shift+M to show/hide system info")
+        else:
+            # A withdrawn window never gets focus, so start with the popup shown
+            self.show_popup()
+            print("Press Ctrl+Shift+M in the popup to minimize it; restore it from the taskbar")
         print("Press Ctrl+C in this window or close it to exit")
         
-    def setup_hotkey_monitoring(self):
-        """Setup hotkey monitoring in a separate thread"""
-        def hotkey_thread():
+    def setup_global_hotkey(self):
+        """Register a system-wide hotkey via the keyboard library's own listener
+        
+        Returns False if it could not be registered.
+        """
+        try:
+            import keyboard
+            keyboard.add_hotkey('ctrl+shift+m', self.toggle_popup)
+            return True
+        except Exception as e:
+            print(f"Hotkey error: {e}")
+            return False
+    
+    def _disable_backend(self, name, error):
+        """Skip a backend from now on, logging why once"""
+        if name in self._disabled:
+            return
+        self._disabled.add(name)
+        # Missing tools/APIs just mean the backend isn't available here - only
+        # real errors deserve a warning
+        if isinstance(error, BACKEND_ABSENT_ERRORS):
+            logging.debug("%s backend unavailable: %s", name, error)
+        else:
+            logging.warning("Disabling %s backend after error: %s", name, error)
+    
+    def reset_backends(self):
+        """Re-enable all backends and probe the GPU ones again (safe from any thread)"""
+        # Backend handles belong to the metrics thread, so it applies the reset itself
+        self._reset_requested = True
+        self._wake.set()
+    
+    def _apply_reset(self):
+        """Drop all backend state and re-probe the GPU backends (metrics thread)"""
+        self._reset_requested = False
+        with self._probe_lock:
+            # Answers still pending from the old probe round must not re-latch or re-disable
+            self._probe_round += 1
+            self._gpu_backend, self._gpu_backend_fn = None, None
+        self._disabled.clear()
+        self._cpu_temp_key = None
+        self._stop_nvsmi()
+        self._nvsmi_loop = True
+        self._wmi = None
+        self._close_pdh()
+        self._select_gpu_backend()
+    
+    def read_temperatures(self):
+        """Read all temperature sensors once per sample (not available on every platform)"""
+        if 'cpu_temp' in self._disabled:
+            return {}
+        try:
+            return psutil.sensors_temperatures()
+        except Exception as e:
+            self._disable_backend('cpu_temp', e)
+            return {}
+    
+    def get_cpu_temperature(self, temps):
+        """Get CPU temperature (°C) from a sensors_temperatures() result - works on Windows with some hardware"""
+        if not temps:
+            return None
+        
+        # Fast path: index straight into the entry that matched last time
+        if self._cpu_temp_key is not None:
+            name, idx = self._cpu_temp_key
             try:
-                keyboard.add_hotkey('ctrl+shift+m', self.toggle_popup)
-                keyboard.wait()  # Keep the thread alive
-            except Exception as e:
-                print(f"Hotkey error: {e}")
+                return temps[name][idx].current
+            except (KeyError, IndexError):
+                self._cpu_temp_key = None
+        
+        try:
+            # Only groups keyed by a CPU chip name are looked at; their first entry is enough
+            name = next((name for name, entries in temps.items()
+                         if entries and any(k in name.lower() for k in self._CPU_KW)), None)
+            if name is None:
+                return None
+            self._cpu_temp_key = (name, 0)
+            return temps[name][0].current
+        except Exception as e:
+            self._disable_backend('cpu_temp', e)
+            return None
+    
+    def get_gpu_info(self, read_temp=True):
+        """Get GPU (temperature °C, usage %) from the backend latched by the first probe
+        
+        Unavailable values are None. With read_temp=False backends that can
+        skip the temperature read do so.
+        """
+        if self._gpu_backend is None:
+            self._select_gpu_backend()
+        with self._probe_lock:
+            backend, read = self._gpu_backend, self._gpu_backend_fn
+        if read is None:
+            return None, None
+        
+        try:
+            return read(read_temp)
+        except Exception as e:
+            # Stop using this backend and let the next sample re-probe the rest
+            self._disable_backend(backend, e)
+            with self._probe_lock:
+                self._probe_round += 1
+                self._gpu_backend, self._gpu_backend_fn = None, None
+            return None, None
+    
+    def _select_gpu_backend(self):
+        """Probe the fallback GPU backends in parallel and latch the best one that works
+        
+        Waits until a backend delivers both values, every probe has answered or
+        GPU_PROBE_TIMEOUT passes. Probes run on daemon threads, so a stuck one
+        can't hold up exit, and one that answers late still takes over if it
+        does better than the backend latched so far.
+        """
+        # A cached NVML handle is known to work - no need to probe anything else
+        if self._nvml_handle is not None and 'nvml' not in self._disabled:
+            self._gpu_backend, self._gpu_backend_fn = 'nvml', self._read_nvml
+            return
         
-        self.hotkey_thread = threading.Thread(target=hotkey_thread, daemon=True)
-        self.hotkey_thread.start()
+        # In order of preference
+        backends = {
+            'nvidia-smi': (self._probe_nvsmi, self._read_nvsmi),
+            'wmi': (self._probe_wmi, self._read_wmi),
+            'pdh': (self._probe_pdh, self._read_pdh),
+        }
+        backends = {name: fns for name, fns in backends.items() if name not in self._disabled}
+        if not backends:
+            self._gpu_backend, self._gpu_backend_fn = 'none', None
+            return
+        
+        with self._probe_lock:
+            self._probe_round += 1
+            self._probe_best = (0, 0)
+            self._probe_pending = len(backends)
+            self._probe_done.clear()
+            self._gpu_backend, self._gpu_backend_fn = 'none', None
+            probe_round = self._probe_round
+        
+        for rank, (name, (probe, read)) in enumerate(backends.items()):
+            threading.Thread(target=self._run_probe, args=(probe_round, rank, name, probe, read),
+                             daemon=True).start()
+        self._probe_done.wait(self.GPU_PROBE_TIMEOUT)
     
-    def get_cpu_temperature(self):
-        """Get CPU temperature - works on Windows with some hardware"""
+    def _run_probe(self, probe_round, rank, name, probe, read):
+        """Probe thread body - run one backend's probe and report how well it did"""
+        error = None
         try:
-            temps = psutil.sensors_temperatures()
-            if temps:
-                for name, entries in temps.items():
-                    for entry in entries:
-                        if 'cpu' in name.lower() or 'core' in name.lower():
-                            return f"{entry.current:.1f}°C"
-            return "N/A"
-        except:
-            return "N/A"
-    
-    def get_gpu_info(self):
-        """Get GPU information using WMI and nvidia-ml-py"""
+            temp, usage = probe()
+        except Exception as e:
+            temp, usage, error = None, None, e
+        # Both values beat one; a backend with neither doesn't count
+        score = (temp is not None) + (usage is not None)
+        self._on_probe_result(probe_round, rank, name, read, score, error)
+    
+    def _on_probe_result(self, probe_round, rank, name, read, score, error=None):
+        """Latch a probed backend if it beats the best result of its round so far"""
+        with self._probe_lock:
+            # A newer round (or a reset) has started since - this answer no longer counts
+            if probe_round != self._probe_round:
+                return
+            self._probe_pending -= 1
+            if error is not None:
+                self._disable_backend(name, error)
+            # More values first, then the order of preference
+            if score and (score, -rank) > self._probe_best:
+                self._probe_best = (score, -rank)
+                self._gpu_backend, self._gpu_backend_fn = name, read
+                print(f"GPU backend: {name}")
+            # Nothing can do better than both values
+            if score == 2 or not self._probe_pending:
+                self._probe_done.set()
+    
+    def _read_nvml(self, read_temp):
+        """Read GPU usage/temperature through the cached NVML handle"""
+        usage = pynvml.nvmlDeviceGetUtilizationRates(self._nvml_handle).gpu
+        if not read_temp:
+            return None, usage
+        temp = pynvml.nvmlDeviceGetTemperature(self._nvml_handle, pynvml.NVML_TEMPERATURE_GPU)
+        return temp, usage
+    
+    def _sync_nvsmi(self):
+        """Start or stop the looping nvidia-smi to match the latched backend"""
+        if self._gpu_backend != 'nvidia-smi' or not self._nvsmi_loop:
+            self._stop_nvsmi()
+        elif self._nvsmi_proc is None:
+            self._start_nvsmi()
+        elif self._nvsmi_proc.poll() is not None:
+            # Exited on its own - stick to one-shot reads
+            self._nvsmi_loop = False
+            self._stop_nvsmi()
+    
+    def _start_nvsmi(self):
+        """Start nvidia-smi in loop mode so each sample is a readline, not a process start"""
         try:
-            import subprocess
-            import json
-            
-            # Try nvidia-smi first (most reliable for NVIDIA GPUs)
+            proc = subprocess.Popen([
+                'nvidia-smi',
+                '-i', '0',
+                '--query-gpu=utilization.gpu,temperature.gpu',
+                '--format=csv,noheader,nounits',
+                '-lms', str(int(self.interval * 1000))
+            ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        except Exception:
+            self._nvsmi_loop = False
+            return
+        
+        # The previous child's last line is stale; _nvsmi_ready marks this one's first
+        self._nvsmi_line = None
+        self._nvsmi_ready.clear()
+        self._nvsmi_proc = proc
+        
+        # Pipes can't be select()ed on Windows, so a reader thread keeps the latest line
+        threading.Thread(target=self._nvsmi_reader, args=(proc,), daemon=True).start()
+    
+    def _stop_nvsmi(self):
+        """Terminate the looping nvidia-smi, if running"""
+        if self._nvsmi_proc is not None:
             try:
-                result = subprocess.run([
-                    'nvidia-smi', 
-                    '--query-gpu=utilization.gpu,temperature.gpu', 
-                    '--format=csv,noheader,nounits'
-                ], capture_output=True, text=True, timeout=5)
-                
-                if result.returncode == 0:
-                    lines = result.stdout.strip().split('\n')
-                    if lines and lines[0]:
-                        values = lines[0].split(', ')
-                        if len(values) >= 2:
-                            usage = f"{values[0].strip()}%"
-                            temp = f"{values[1].strip()}°C"
-                            return temp, usage
-            except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
+                self._nvsmi_proc.terminate()
+            except Exception:
                 pass
+            self._nvsmi_proc = None
+    
+    def _nvsmi_reader(self, proc):
+        """Keep the most recent line printed by the looping nvidia-smi"""
+        try:
+            for line in proc.stdout:
+                # A stopped child's last lines must not overwrite its successor's
+                if line.strip() and proc is self._nvsmi_proc:
+                    self._nvsmi_line = line
+                    self._nvsmi_ready.set()
+        except Exception:
+            pass
+    
+    def _parse_nvsmi(self, output):
+        """Parse 'utilization, temperature' CSV output from nvidia-smi"""
+        lines = output.strip().split('\n')
+        if lines and lines[0]:
+            values = lines[0].split(', ')
+            if len(values) >= 2:
+                # Each field on its own, so one '[N/A]' doesn't hide the other
+                return self._nvsmi_value(values[1]), self._nvsmi_value(values[0])
+        return None, None
+    
+    def _nvsmi_value(self, field):
+        """One nvidia-smi CSV field as a float, or None if it isn't a number"""
+        try:
+            return float(field)
+        except ValueError:
+            return None
+    
+    def _read_nvsmi(self, read_temp):
+        """Read GPU usage/temperature from the looping nvidia-smi"""
+        if self._nvsmi_proc is not None and self._nvsmi_proc.poll() is None:
+            # Right after a start, wait for the first line rather than spawning a second nvidia-smi
+            if self._nvsmi_ready.wait(self.NVSMI_FIRST_LINE_TIMEOUT):
+                return self._parse_nvsmi(self._nvsmi_line)
+            # Running but silent - don't stall every sample on it
+            self._nvsmi_loop = False
+            self._stop_nvsmi()
+        return self._read_nvsmi_once()
+    
+    def _read_nvsmi_once(self):
+        """Read GPU usage/temperature by spawning nvidia-smi (used if it can't be kept running)"""
+        result = subprocess.run([
+            'nvidia-smi', 
+            '-i', '0',
+            '--query-gpu=utilization.gpu,temperature.gpu', 
+            '--format=csv,noheader,nounits'
+        ], capture_output=True, text=True, timeout=5)
+        
+        if result.returncode == 0:
+            return self._parse_nvsmi(result.stdout)
+        return None, None
+    
+    def _query_wmi(self, conn, read_temp):
+        """Read GPU load/temperature from OpenHardwareMonitor over a WMI connection"""
+        gpu_temp = None
+        gpu_usage = None
+        
+        if read_temp:
+            rows = conn.query(self.WMI_GPU_TEMP_QUERY)
+            if rows:
+                gpu_temp = rows[0].Value
+        
+        rows = conn.query(self.WMI_GPU_LOAD_QUERY)
+        if rows:
+            gpu_usage = rows[0].Value
+        
+        return gpu_temp, gpu_usage
+    
+    def _read_wmi(self, read_temp):
+        """Read GPU info over the metrics thread's own WMI connection"""
+        if self._wmi is None:
+            self._connect_wmi()
+        if self._wmi is None:
+            raise RuntimeError("no WMI connection")
+        return self._query_wmi(self._wmi, read_temp)
+    
+    def _read_pdh(self, read_temp):
+        """Read GPU usage from the PDH query (no temperature available)"""
+        if self._pdh_query is None:
+            return None, None
+        return None, self._read_pdh_usage()
+    
+    def _probe_nvsmi(self):
+        """Probe nvidia-smi for the backend selection"""
+        # One-shot, so nvidia-smi is only kept looping once it is the latched backend
+        return self._read_nvsmi_once()
+    
+    def _probe_wmi(self):
+        """Probe OpenHardwareMonitor WMI for the backend selection"""
+        # COM objects are bound to the thread that created them, so the probe
+        # uses a throwaway connection of its own
+        if wmi is None:
+            return None, None
+        pythoncom.CoInitialize()
+        conn = wmi.WMI(namespace="root/OpenHardwareMonitor")
+        return self._query_wmi(conn, True)
+    
+    def _probe_pdh(self):
+        """Probe the GPU performance counters for the backend selection"""
+        self._open_pdh()
+        if self._pdh_query is not None:
+            # Rate counters only have valid data once the baseline collection has aged
+            time.sleep(1.0)
+        return self._read_pdh(True)
+    
+    def _open_pdh(self):
+        """Open the GPU engine performance counter query once (Windows only)"""
+        if self._pdh_query is not None:
+            return
+        if sys.platform != 'win32':
+            return
+        try:
+            pdh = ctypes.windll.pdh
+            query = ctypes.c_void_p()
+            if pdh.PdhOpenQueryW(None, 0, ctypes.byref(query)) != 0:
+                return
             
-            # Fallback: Try WMI for basic GPU info
-            try:
-                import wmi
-                c = wmi.WMI(namespace="root/OpenHardwareMonitor")
-                
-                gpu_temp = "N/A"
-                gpu_usage = "N/A"
-                
-                for sensor in c.Sensor():
-                    if 'gpu' in sensor.Name.lower():
-                        if 'temperature' in sensor.SensorType.lower():
-                            gpu_temp = f"{sensor.Value:.0f}°C"
-                        elif 'load' in sensor.SensorType.lower():
-                            gpu_usage = f"{sensor.Value:.0f}%"
-                
-                return gpu_temp, gpu_usage
-            except:
-                pass
+            counter = ctypes.c_void_p()
+            if pdh.PdhAddEnglishCounterW(query, self.PDH_GPU_COUNTER, 0, ctypes.byref(counter)) != 0:
+                pdh.PdhCloseQuery(query)
+                return
             
-            # Final fallback: Try getting GPU usage from performance counters
+            # Rate counters need a first collection as their baseline
+            pdh.PdhCollectQueryData(query)
+            self._pdh_query = query
+            self._pdh_counters['gpu_usage'] = counter
+        except Exception as e:
+            self._disable_backend('pdh', e)
+    
+    def _close_pdh(self):
+        """Close the PDH query, if open"""
+        if self._pdh_query is not None:
             try:
-                result = subprocess.run([
-                    'powershell', 
-                    '-Command', 
-                    '(Get-Counter "\\GPU Engine(*)\\Utilization Percentage").CounterSamples | Select-Object -First 1 | Select-Object -ExpandProperty CookedValue'
-                ], capture_output=True, text=True, timeout=5)
-                
-                if result.returncode == 0 and result.stdout.strip():
-                    usage_value = float(result.stdout.strip())
-                    return "N/A", f"{usage_value:.1f}%"
-            except:
+                ctypes.windll.pdh.PdhCloseQuery(self._pdh_query)
+            except Exception:
                 pass
+            self._pdh_query = None
+    
+    def _read_pdh_usage(self):
+        """Collect the PDH query and sum GPU utilization across engine instances"""
+        pdh = ctypes.windll.pdh
+        counter = self._pdh_counters['gpu_usage']
+        if pdh.PdhCollectQueryData(self._pdh_query) != 0:
+            return None
+        
+        # First call reports the buffer size needed for all instances
+        size = ctypes.c_ulong(0)
+        count = ctypes.c_ulong(0)
+        status = pdh.PdhGetFormattedCounterArrayW(counter, PDH_FMT_DOUBLE,
+                                                  ctypes.byref(size), ctypes.byref(count), None)
+        if status & 0xFFFFFFFF != PDH_MORE_DATA:
+            return None
+        
+        buffer = ctypes.create_string_buffer(size.value)
+        status = pdh.PdhGetFormattedCounterArrayW(counter, PDH_FMT_DOUBLE,
+                                                  ctypes.byref(size), ctypes.byref(count), buffer)
+        if status != 0:
+            return None
+        
+        items = ctypes.cast(buffer, ctypes.POINTER(PDH_FMT_COUNTERVALUE_ITEM_W))
+        # Skip instances without valid data (e.g. before a rate counter has two collections)
+        values = [items[i].FmtValue.doubleValue for i in range(count.value)
+                  if items[i].FmtValue.CStatus in (PDH_CSTATUS_VALID_DATA, PDH_CSTATUS_NEW_DATA)]
+        if not values:
+            return None
+        return min(sum(values), 100.0)
+    
+    def _connect_wmi(self):
+        """Open the OpenHardwareMonitor WMI connection on the calling thread"""
+        if wmi is None:
+            return
+        try:
+            # COM must be initialized on every thread that uses it
+            pythoncom.CoInitialize()
+            self._wmi = wmi.WMI(namespace="root/OpenHardwareMonitor")
+        except Exception as e:
+            self._disable_backend('wmi', e)
+    
+    def _sample_loop(self):
+        """Metrics thread body - samples until monitoring stops"""
+        # Probe the GPU backends at startup so the first shown sample doesn't wait on it
+        self._select_gpu_backend()
+        
+        while self.monitoring:
+            if self._reset_requested:
+                self._apply_reset()
+            if self.is_popup_visible:
+                self._sync_nvsmi()
+                values = self._sample_once()
+                if values is not None:
+                    self._current_interval = self._next_interval(values)
                 
-            return "N/A", "N/A"
-            
+                self._next_deadline += self._current_interval
+                now = time.monotonic()
+                if self._next_deadline < now:
+                    # A slow sample overran its slot - restart the cadence instead of bursting
+                    self._next_deadline = now
+                self._wake.wait(self._next_deadline - now)
+            else:
+                # Nobody is looking - stop nvidia-smi, only keep cpu_percent's delta from going stale
+                self._stop_nvsmi()
+                psutil.cpu_percent(interval=None)
+                # Read temperatures and poll at full rate right after the popup is shown
+                self._tick = 0
+                self._current_interval = self.interval
+                self._last_vals = None
+                self._wake.wait(self.HIDDEN_HEARTBEAT)
+                self._next_deadline = time.monotonic()
+            self._wake.clear()
+    
+    def _on_battery(self):
+        """True when running on battery power"""
+        if 'battery' in self._disabled:
+            return False
+        try:
+            battery = psutil.sensors_battery()
+            return battery is not None and battery.power_plugged is False
         except Exception as e:
-            print(f"GPU info error: {e}")
-            return "N/A", "N/A"
+            self._disable_backend('battery', e)
+            return False
+    
+    def _next_interval(self, values):
+        """Double the interval while values are unchanged, drop back to the floor when they move"""
+        # Compare at the displayed precision - raw floats practically never repeat
+        values = tuple(None if v is None else round(v, 1) for v in values)
+        
+        floor = self.interval
+        if self._on_battery():
+            floor *= 2
+        
+        if values == self._last_vals:
+            interval = min(max(self._current_interval * 2, floor), self.max_interval)
+        else:
+            interval = floor
+        
+        self._last_vals = values
+        return interval
     
-    def update_system_info(self):
-        """Update system information - called by tkinter's main loop"""
+    def _sample_once(self):
+        """Take one sample of all metrics and publish it as the current snapshot
+        
+        Returns the sampled (cpu, mem, gpu_usage, cpu_temp, gpu_temp) values, or None on error.
+        """
+        read_temp = self._tick % self._temp_every == 0
+        self._tick += 1
+        
+        # Only this thread writes the snapshot, so the previous one can be read without the lock
+        previous = self._snapshot
+        
         try:
-            # Get CPU info
-            self.cpu_percent = psutil.cpu_percent(interval=None)
-            self.cpu_temp = self.get_cpu_temperature()
-            
-            # Get Memory info
-            memory = psutil.virtual_memory()
-            self.memory_percent = memory.percent
+            # Batch the psutil reads together; sensors are read once and shared
+            cpu_percent = psutil.cpu_percent(interval=None)
+            memory_percent = psutil.virtual_memory().percent
+            if read_temp:
+                temps = self.read_temperatures()
+                cpu_temp = self.get_cpu_temperature(temps)
+            else:
+                cpu_temp = previous['cpu_temp']
             
             # Get GPU info (basic)
-            self.gpu_temp, self.gpu_usage = self.get_gpu_info()
-            
-            # Update popup if visible
-            if self.is_popup_visible and self.popup_window:
-                self.update_popup_content()
-                
+            gpu_temp, gpu_usage = self.get_gpu_info(read_temp)
+            if not read_temp:
+                gpu_temp = previous['gpu_temp']
         except Exception as e:
             print(f"Monitoring error: {e}")
+            return None
+        
+        with self._lock:
+            self._snapshot = {
+                'cpu_percent': cpu_percent,
+                'cpu_temp': cpu_temp,
+                'memory_percent': memory_percent,
+                'gpu_temp': gpu_temp,
+                'gpu_usage': gpu_usage,
+                'sampled_at': datetime.now().strftime("%H:%M:%S"),
+            }
+        
+        return cpu_percent, memory_percent, gpu_usage, cpu_temp, gpu_temp
+    
+    def _refresh_popup(self):
+        """Copy the latest snapshot into the popup - called by tkinter's main loop"""
+        if self.is_popup_visible:
+            with self._lock:
+                snapshot = self._snapshot
+            
+            self.cpu_percent = snapshot['cpu_percent']
+            self.cpu_temp = snapshot['cpu_temp']
+            self.memory_percent = snapshot['memory_percent']
+            self.gpu_temp = snapshot['gpu_temp']
+            self.gpu_usage = snapshot['gpu_usage']
+            self.sampled_at = snapshot['sampled_at']
+            self._schedule_refresh()
         
-        # Schedule next update (every 2 seconds)
         if self.monitoring:
-            self.root.after(2000, self.update_system_info)
+            self.root.after(500, self._refresh_popup)
     
     def create_popup(self):
-        """Create the popup window"""
-        if self.popup_window:
-            return
-            
-        self.popup_window = tk.Toplevel(self.root)
-        self.popup_window.title("System Monitor")
-        self.popup_window.configure(bg='#2b2b2b')
+        """Build the popup widgets directly on the root window - built once and then shown/hidden"""
+        self.root.title("System Monitor")
+        self.root.configure(bg='#2b2b2b')
         
         # Make window stay on top
-        self.popup_window.attributes('-topmost', True)
+        self.root.attributes('-topmost', True)
         
-        # Remove window decorations for cleaner look
-        self.popup_window.overrideredirect(True)
+        # Remove window decorations for cleaner look - only with the global hotkey,
+        # otherwise the window must stay minimizable and focusable
+        if self.global_hotkey:
+            self.root.overrideredirect(True)
         
         # Position window at top-right corner with better sizing
-        screen_width = self.popup_window.winfo_screenwidth()
-        screen_height = self.popup_window.winfo_screenheight()
+        screen_width = self.root.winfo_screenwidth()
+        screen_height = self.root.winfo_screenheight()
         
         # Make window bigger to fit all content
         window_width = 320
@@ -172,10 +739,10 @@ class SystemMonitor:
         x_pos = screen_width - window_width - 20
         y_pos = 50
         
-        self.popup_window.geometry(f"{window_width}x{window_height}+{x_pos}+{y_pos}")
+        self.root.geometry(f"{window_width}x{window_height}+{x_pos}+{y_pos}")
         
         # Create main frame with more padding
-        main_frame = tk.Frame(self.popup_window, bg='#2b2b2b', padx=20, pady=15)
+        main_frame = tk.Frame(self.root, bg='#2b2b2b', padx=20, pady=15)
         main_frame.pack(fill='both', expand=True)
         
         # Title
@@ -191,12 +758,14 @@ class SystemMonitor:
         tk.Label(cpu_frame, text="CPU:", font=('Arial', 10, 'bold'), 
                 fg='#4CAF50', bg='#2b2b2b').pack(anchor='w')
         
-        self.cpu_usage_label = tk.Label(cpu_frame, text="Usage: 0%", 
+        self.cpu_usage_var = tk.StringVar(self.root, value="Usage: 0%")
+        self.cpu_usage_label = tk.Label(cpu_frame, textvariable=self.cpu_usage_var, 
                                        font=('Arial', 9), 
                                        fg='#ffffff', bg='#2b2b2b')
         self.cpu_usage_label.pack(anchor='w', padx=(15, 0))
         
-        self.cpu_temp_label = tk.Label(cpu_frame, text="Temp: N/A", 
+        self.cpu_temp_var = tk.StringVar(self.root, value="Temp: N/A")
+        self.cpu_temp_label = tk.Label(cpu_frame, textvariable=self.cpu_temp_var, 
                                       font=('Arial', 9), 
                                       fg='#ffffff', bg='#2b2b2b')
         self.cpu_temp_label.pack(anchor='w', padx=(15, 0))
@@ -208,7 +777,8 @@ class SystemMonitor:
         tk.Label(mem_frame, text="Memory:", font=('Arial', 10, 'bold'), 
                 fg='#2196F3', bg='#2b2b2b').pack(anchor='w')
         
-        self.memory_label = tk.Label(mem_frame, text="Usage: 0%", 
+        self.memory_var = tk.StringVar(self.root, value="Usage: 0%")
+        self.memory_label = tk.Label(mem_frame, textvariable=self.memory_var, 
                                     font=('Arial', 9), 
                                     fg='#ffffff', bg='#2b2b2b')
         self.memory_label.pack(anchor='w', padx=(15, 0))
@@ -220,18 +790,21 @@ class SystemMonitor:
         tk.Label(gpu_frame, text="GPU:", font=('Arial', 10, 'bold'), 
                 fg='#FF9800', bg='#2b2b2b').pack(anchor='w')
         
-        self.gpu_usage_label = tk.Label(gpu_frame, text="Usage: N/A", 
+        self.gpu_usage_var = tk.StringVar(self.root, value="Usage: N/A")
+        self.gpu_usage_label = tk.Label(gpu_frame, textvariable=self.gpu_usage_var, 
                                        font=('Arial', 9), 
                                        fg='#ffffff', bg='#2b2b2b')
         self.gpu_usage_label.pack(anchor='w', padx=(15, 0))
         
-        self.gpu_temp_label = tk.Label(gpu_frame, text="Temp: N/A", 
+        self.gpu_temp_var = tk.StringVar(self.root, value="Temp: N/A")
+        self.gpu_temp_label = tk.Label(gpu_frame, textvariable=self.gpu_temp_var, 
                                       font=('Arial', 9), 
                                       fg='#ffffff', bg='#2b2b2b')
         self.gpu_temp_label.pack(anchor='w', padx=(15, 0))
         
         # Timestamp
-        self.timestamp_label = tk.Label(main_frame, text="", 
+        self.timestamp_var = tk.StringVar(self.root, value="")
+        self.timestamp_label = tk.Label(main_frame, textvariable=self.timestamp_var, 
                                        font=('Arial', 8), 
                                        fg='#888888', bg='#2b2b2b')
         self.timestamp_label.pack(pady=(15, 5))
@@ -243,33 +816,45 @@ class SystemMonitor:
                              font=('Arial', 8),
                              padx=10, pady=5)
         close_btn.pack(pady=(5, 0))
-        
-        # Update content immediately
+    
+    def _schedule_refresh(self):
+        """Coalesce popup refresh requests that arrive within 50 ms into one"""
+        if not self._pending_refresh:
+            self._pending_refresh = self.root.after(50, self._do_refresh)
+    
+    def _do_refresh(self):
+        """Run a coalesced popup refresh"""
+        self._pending_refresh = None
         self.update_popup_content()
-        
-        # Handle window close
-        self.popup_window.protocol("WM_DELETE_WINDOW", self.hide_popup)
+    
+    def _show(self, key, var, value, fmt, na):
+        """Format value into a label's StringVar, skipping both when the value hasn't changed"""
+        if key in self._shown and self._shown[key] == value:
+            return
+        self._shown[key] = value
+        text = na if value is None else fmt(value)
+        if var.get() != text:
+            var.set(text)
     
     def update_popup_content(self):
         """Update the popup window content with current data"""
-        if not self.popup_window or not self.is_popup_visible:
+        if not self.is_popup_visible:
             return
             
         try:
             # Update CPU info
-            self.cpu_usage_label.config(text=f"Usage: {self.cpu_percent:.1f}%")
-            self.cpu_temp_label.config(text=f"Temp: {self.cpu_temp}")
+            self._show('cpu_usage', self.cpu_usage_var, self.cpu_percent, self._F_USAGE, self._USAGE_NA)
+            self._show('cpu_temp', self.cpu_temp_var, self.cpu_temp, self._F_TEMP, self._TEMP_NA)
             
             # Update Memory info
-            self.memory_label.config(text=f"Usage: {self.memory_percent:.1f}%")
+            self._show('memory', self.memory_var, self.memory_percent, self._F_USAGE, self._USAGE_NA)
             
             # Update GPU info
-            self.gpu_usage_label.config(text=f"Usage: {self.gpu_usage}")
-            self.gpu_temp_label.config(text=f"Temp: {self.gpu_temp}")
+            self._show('gpu_usage', self.gpu_usage_var, self.gpu_usage, self._F_USAGE, self._USAGE_NA)
+            self._show('gpu_temp', self.gpu_temp_var, self.gpu_temp, self._F_TEMP, self._TEMP_NA)
             
-            # Update timestamp
-            current_time = datetime.now().strftime("%H:%M:%S")
-            self.timestamp_label.config(text=f"Updated: {current_time}")
+            # Update timestamp (when the data was sampled, not when it was drawn)
+            self._show('timestamp', self.timestamp_var, self.sampled_at, self._F_UPDATED, "")
             
         except Exception as e:
             print(f"Error updating popup: {e}")
@@ -277,18 +862,34 @@ class SystemMonitor:
     def show_popup(self):
         """Show the popup window"""
         if not self.is_popup_visible:
-            self.create_popup()
+            self.root.deiconify()
             self.is_popup_visible = True
+            self._schedule_refresh()
+            # Sample right away so the popup shows fresh data
+            self._wake.set()
     
     def hide_popup(self):
-        """Hide the popup window"""
-        if self.is_popup_visible and self.popup_window:
-            self.popup_window.destroy()
-            self.popup_window = None
+        """Hide the popup window (kept alive for the next show)"""
+        if self.is_popup_visible:
+            self.is_popup_visible = False
+            if self.global_hotkey:
+                self.root.withdraw()
+            else:
+                # Minimize instead, so the window can be restored and focused again
+                self.root.iconify()
+    
+    def _on_map(self, event):
+        """Treat the window being restored (e.g. from the taskbar) as showing the popup"""
+        if event.widget is self.root and not self.is_popup_visible:
+            self.show_popup()
+    
+    def _on_unmap(self, event):
+        """Treat the window being minimized as hiding the popup, so sampling stops"""
+        if event.widget is self.root:
             self.is_popup_visible = False
     
     def toggle_popup(self):
-        """Toggle popup visibility - called from hotkey thread"""
+        """Toggle popup visibility - called from the keyboard listener thread"""
         # Schedule the toggle to run in the main thread
         self.root.after(0, self._toggle_popup_main_thread)
     
@@ -302,22 +903,31 @@ class SystemMonitor:
     def shutdown(self):
         """Clean shutdown"""
         self.monitoring = False
+        self._wake.set()
         self.hide_popup()
-        try:
-            keyboard.unhook_all()
-        except:
-            pass
+        if self.global_hotkey:
+            try:
+                import keyboard
+                keyboard.unhook_all()
+            except:
+                pass
+        if self._nvml_handle is not None:
+            try:
+                pynvml.nvmlShutdown()
+            except Exception:
+                pass
+            self._nvml_handle = None
+        self._stop_nvsmi()
+        self._close_pdh()
         self.root.quit()
 
 def main():
     """Main function"""
-    # Create root window (hidden)
+    # Create root window (becomes the popup, hidden until the hotkey)
     root = tk.Tk()
-    root.withdraw()  # Hide the main window
-    root.title("System Monitor (Hidden)")
     
     # Create system monitor
-    monitor = SystemMonitor(root)
+    monitor = SystemMonitor(root, global_hotkey="--focus-hotkey" not in sys.argv)
     
     # Handle window close event
     def on_closing():